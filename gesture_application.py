@@ -1,9 +1,15 @@
+import time
+START_TIME = time.perf_counter() # Für Messung der Zeit bis zum ersten gezeichneten Frame
+
 import pyglet
 import random
 import threading
 from pyglet.window import mouse
-from recognizer import OneDollarRecognizer
+from recognition_service import BackgroundRecognizer
 from pointing_input import HandDetection
+from gesture_spotting import GestureSpotter
+from pose_recognizer import PoseRecognizer
+from stroke_capture import StrokeCapture, APPENDED, REPLACED
 
 # Spieleinstellungen
 ROUND_TIME = 10.0
@@ -29,6 +35,9 @@ DEBUG = False # Anzeige von Prints, Landmarks etc.
 NUM_HANDS = 1
 DETECTION_CONFIDENCE = 0.7
 TRACKING_CONFIDENCE = 0.7
+SPOTTING_MODE = False # Zauber direkt aus der Fingerbewegung erkennen (ohne Zeichnen per Pinch)
+POSES_PATH = "poses"
+CONFIRM_POSE = "daumen" # Handpose, die wie ENTER wirkt (Spiel starten/neu starten)
 
 # GUI
 window = pyglet.window.Window(800, 600, "Hogwarts Zaubertraining")
@@ -38,17 +47,25 @@ status_label = pyglet.text.Label("", x=10, y=window.height - 30, font_size=16)
 gesture_label = pyglet.text.Label("", x=10, y=window.height - 60, font_size=16)
 score_label = pyglet.text.Label("", x=10, y=window.height - 90, font_size=16)
 timer_label = pyglet.text.Label("", x=window.width - 150, y=window.height - 30, font_size=16)
+loading_label = pyglet.text.Label("", x=10, y=10, font_size=12)
 
 gesture_overview = pyglet.image.load("spell_overview.png")
 gesture_overview_sprite = pyglet.sprite.Sprite(gesture_overview, x=0, y=0)
 
-points = [] # Liste der Punkte der gezeichneten Geste/Zauberspruch
+stroke = StrokeCapture(RESAMPLE_POINTS) # Punkte der gezeichneten Geste/Zauberspruch (fast gerade Stücke zusammengefasst, begrenzte Länge)
 drawn_lines = [] # Bisher gezeichneter Pfad der Geste/Zauberspruch
 
 # Zaubererkennung
-recognizer = OneDollarRecognizer(BB_SIZE, RESAMPLE_POINTS, TEMPLATES_PATH, SUBJECT)
+recognizer = BackgroundRecognizer(TEMPLATES_PATH, BB_SIZE, RESAMPLE_POINTS, SUBJECT) # Lädt im Hintergrund (bzw. nutzt laufenden Erkennungsdienst)
 enough_points = False
-hand_detector = HandDetection(NUM_HANDS, DETECTION_CONFIDENCE, TRACKING_CONFIDENCE, DRAWING_THRESHOLD, SHOW_CAM, DEBUG)
+spotter = GestureSpotter(recognizer, allowed=GESTURES.values()) if SPOTTING_MODE else None
+pose_recognizer = PoseRecognizer(POSES_PATH, SUBJECT)
+window.register_event_type("on_spell_spotted")
+window.register_event_type("on_pose")
+hand_detector = HandDetection(NUM_HANDS, DETECTION_CONFIDENCE, TRACKING_CONFIDENCE, DRAWING_THRESHOLD, SHOW_CAM, DEBUG, spotter,
+                              on_gesture=lambda name, score: pyglet.app.platform_event_loop.post_event(window, "on_spell_spotted", name, score), # Event threadsicher an pyglet übergeben
+                              pose_recognizer=pose_recognizer,
+                              on_pose=lambda name, score: pyglet.app.platform_event_loop.post_event(window, "on_pose", name, score))
 threading.Thread(target=hand_detector.run, daemon=True).start()
 
 # Spielvariablen
@@ -59,6 +76,7 @@ time_left = ROUND_TIME
 hand_was_drawing = False
 game_over = False
 startscreen = True
+first_frame_drawn = False
 
 
 ########################################################################################################
@@ -87,7 +105,7 @@ def reset_drawing():
     global enough_points
     
     enough_points = False
-    points.clear()
+    stroke.clear()
     drawn_lines.clear()
 
 
@@ -95,8 +113,7 @@ def reset_drawing():
 @window.event
 def on_mouse_press(x, y, button, modifiers):
     if button == mouse.LEFT and not startscreen:
-        points.clear()
-        points.append((x, y))
+        stroke.start(x, y)
 
 
 # Bei Maus Drag immer wieder Linien zwischen bisherigem Pfad und neuster Position der Maus setzen
@@ -109,48 +126,88 @@ def on_mouse_drag(x, y, dx, dy, buttons, modifiers):
 # Auswertung der Geste nach Loslassen der linken Maustaste
 @window.event
 def on_mouse_release(x, y, button, modifiers):
-    global score, failures, enough_points, game_over
+    global enough_points
 
     if button == mouse.LEFT and not startscreen and not game_over:
         create_line(x, y) # Linie bis zum letzten Punkt fortsetzen
-        if len(points) >= recognizer.n: # Prüfen, ob Geste aus genügend Punkten bestand (groß/lang genug ist)
+        if not recognizer.ready.is_set(): # Templates noch nicht geladen
+            status_label.text = "Die Zaubersprüche werden noch geladen..."
+        elif recognizer.error: # Laden fehlgeschlagen
+            status_label.text = f"Zaubersprüche konnten nicht geladen werden: {recognizer.error}"
+        elif stroke.num_events >= recognizer.n: # Prüfen, ob Geste aus genügend Punkten bestand (groß/lang genug ist)
             enough_points = True
-            name, confidence_score = recognizer.recognize(points)
-            if name == GESTURES[current_target]: # Falls gerade gewollte Geste gemalt -> Score erhöhen
-                score += 1
-                status_label.text = "Richtig!"
-            else: # Falls faksche Geste erkannt -> Fehler erhöhen
-                failures += 1
-                status_label.text = f"Falsch, das war ziemlich sicher ({confidence_score}) {name}!"
-            update_game_state() # Spielzustand anpassen
+            name, confidence_score = recognizer.recognize(stroke.points, allowed=GESTURES.values()) # Nur gegen die Zauber im Spiel matchen
+            evaluate_spell(name, confidence_score)
         else: # Falls zu wenige Punkte erkannt
             status_label.text = "Schwinge den Zauberstab etwas ausgiebiger!"
         reset_drawing()
 
 
-# Linien, aus denen die Gesten bestehen, erstellen
+# Im Spotting-Modus erkannter Zauber (kommt aus dem Thread der Handerkennung)
+@window.event
+def on_spell_spotted(name, confidence_score):
+    if not startscreen and not game_over:
+        evaluate_spell(name, confidence_score)
+
+
+# Erkannten Zauber mit dem gewollten vergleichen
+def evaluate_spell(name, confidence_score):
+    global score, failures
+
+    if name == GESTURES[current_target]: # Falls gerade gewollte Geste gemalt -> Score erhöhen
+        score += 1
+        status_label.text = "Richtig!"
+    else: # Falls faksche Geste erkannt -> Fehler erhöhen
+        failures += 1
+        status_label.text = f"Falsch, das war ziemlich sicher ({confidence_score}) {name}!"
+    update_game_state() # Spielzustand anpassen
+
+
+# Linien, aus denen die Gesten bestehen, erstellen (eine Linie je gespeichertem Punkt, zusammengefasste Punkte verlängern die letzte Linie)
 def create_line(x, y):
-    if points:
-        x1, y1 = points[-1]
-        line = pyglet.shapes.Line(x1, y1, x, y, thickness=2, color=(255, 255, 255), batch=batch)
-        drawn_lines.append(line) # Linie abspeichern
-    points.append((x, y)) # Endpunkt abspeichern (für Gestenerkennung)
+    result = stroke.add(x, y) # Endpunkt abspeichern (für Gestenerkennung)
+    if result == REPLACED:
+        drawn_lines[-1].x2 = x
+        drawn_lines[-1].y2 = y
+    elif result == APPENDED:
+        if len(drawn_lines) == len(stroke) - 2:
+            (x1, y1), (x2, y2) = stroke.points[-2:]
+            drawn_lines.append(pyglet.shapes.Line(x1, y1, x2, y2, thickness=2, color=(255, 255, 255), batch=batch)) # Linie abspeichern
+        else: # Erfassung hat ausgedünnt -> Linien aus den verbliebenen Punkten neu aufbauen
+            drawn_lines.clear()
+            for (x1, y1), (x2, y2) in zip(stroke.points, stroke.points[1:]):
+                drawn_lines.append(pyglet.shapes.Line(x1, y1, x2, y2, thickness=2, color=(255, 255, 255), batch=batch))
 
 
 # Tastendruck Verarbeitung
 @window.event
 def on_key_press(symbol, modifiers):
-    global startscreen, score, failures, game_over
+    if symbol == pyglet.window.key.ENTER:
+        confirm()
+
+
+# Erkannte Handpose als Befehl (kommt aus dem Thread der Handerkennung)
+@window.event
+def on_pose(name, confidence_score):
+    if name == CONFIRM_POSE:
+        confirm()
 
-    if startscreen and symbol == pyglet.window.key.ENTER:
+
+# Spiel starten bzw. nach Spielende zurück zum Startbildschirm
+def confirm():
+    global startscreen
+
+    if startscreen:
         startscreen = False
         new_round()
-    elif game_over and symbol == pyglet.window.key.ENTER:
+    elif game_over:
         new_game()
 
 
 @window.event
 def on_draw():
+    global first_frame_drawn
+
     window.clear()
     if startscreen:
         gesture_overview_sprite.draw()
@@ -162,6 +219,30 @@ def on_draw():
         timer_label.draw()
         if game_over:
             pyglet.text.Label("Spiel beendet - drücke ENTER für Neustart", x=window.width // 2 - 180, y=window.height // 2, font_size=18).draw()
+    draw_loading_state()
+
+    if not first_frame_drawn:
+        first_frame_drawn = True
+        print(f"Zeit bis zum ersten Frame: {(time.perf_counter() - START_TIME) * 1000:.0f} ms")
+
+
+# Anzeigen, was noch im Hintergrund geladen wird (bzw. was beim Laden fehlgeschlagen ist)
+def draw_loading_state():
+    loading = []
+    if not recognizer.ready.is_set():
+        loading.append("Zaubersprüche")
+    if not hand_detector.ready.is_set():
+        loading.append("Handerkennung")
+    messages = []
+    if recognizer.error:
+        messages.append(f"Fehler beim Laden der Zaubersprüche: {recognizer.error}")
+    if hand_detector.error:
+        messages.append(f"Fehler beim Laden der Handerkennung: {hand_detector.error}")
+    if loading:
+        messages.append(f"Lade {' und '.join(loading)}...")
+    if messages:
+        loading_label.text = " | ".join(messages)
+        loading_label.draw()
 
 
 # Nach Auswertung Spielzustände anpassen (Nächste Runde, falls nicht Score hoch genug / Fehler zu viele)
@@ -1,16 +1,22 @@
 # gesture input program for first task
 
+import time
+START_TIME = time.perf_counter() # Für Messung der Zeit bis zum ersten gezeichneten Frame
+
 import pyglet
 from pyglet import shapes
 from pyglet.window import mouse
-from recognizer import OneDollarRecognizer
+from recognition_service import BackgroundRecognizer
 from pointing_input import HandDetection
+from pose_recognizer import PoseRecognizer
+from stroke_capture import StrokeCapture, APPENDED, REPLACED
 import threading
 
 # Gesture Recognizer Konstanten
 SUBJECT = "1"
 TRAINING_MODE = False # Abspeichern von Gesten möglich machen (Per STRG + T in der Anwendung umschaltbar)
 TEMPLATES_PATH = "templates"
+POSES_PATH = "poses" # Pose-Samples (Handposen), im Trainingsmodus per STRG + P aufnehmbar
 RESAMPLE_POINTS = 64
 BB_SIZE = 250
 
@@ -28,13 +34,20 @@ status_label = pyglet.text.Label("Statuslabel", font_size=16, x=10, y=window.hei
 batch = pyglet.graphics.Batch()
 template_name = "" # Name der zu speichernden Gesten-Template
 template_name_input_label = pyglet.text.Label("Template name:", font_size=16, x=10, y=window.height - 60)
+loading_label = pyglet.text.Label("", font_size=12, x=10, y=10)
+pose_label = pyglet.text.Label("", font_size=12, x=window.width - 10, y=10, anchor_x="right") # Zuletzt erkannte Handpose (eigenes Label, damit das Erkennungsergebnis stehen bleibt)
 
-points = [] # Liste der Punkte der gezeichneten Geste
+stroke = StrokeCapture(RESAMPLE_POINTS) # Punkte der gezeichneten Geste (fast gerade Stücke zusammengefasst, begrenzte Länge)
 drawn_lines = [] # Bisher gezeichneter Pfad der Geste
 
-recognizer = OneDollarRecognizer(bb_size=BB_SIZE, resample_points=RESAMPLE_POINTS, templates_path=TEMPLATES_PATH, subject=SUBJECT)
+recognizer = BackgroundRecognizer(TEMPLATES_PATH, bb_size=BB_SIZE, resample_points=RESAMPLE_POINTS, subject=SUBJECT) # Lädt im Hintergrund (bzw. nutzt laufenden Erkennungsdienst)
 enough_points = False
-hand_detector = HandDetection(NUM_HANDS, DETECTION_CONFIDENCE, TRACKING_CONFIDENCE, DRAWING_THRESHOLD, SHOW_CAM, DEBUG)
+first_frame_drawn = False
+pose_recognizer = PoseRecognizer(POSES_PATH, SUBJECT)
+window.register_event_type("on_pose")
+hand_detector = HandDetection(NUM_HANDS, DETECTION_CONFIDENCE, TRACKING_CONFIDENCE, DRAWING_THRESHOLD, SHOW_CAM, DEBUG,
+                              pose_recognizer=pose_recognizer,
+                              on_pose=lambda name, score: pyglet.app.platform_event_loop.post_event(window, "on_pose", name, score)) # Event threadsicher an pyglet übergeben
 threading.Thread(target=hand_detector.run, daemon=True).start()
 
 
@@ -44,8 +57,7 @@ threading.Thread(target=hand_detector.run, daemon=True).start()
 @window.event
 def on_mouse_press(x, y, button, modifiers):
     if button == mouse.LEFT:
-        points.clear()
-        points.append((x, y))
+        stroke.start(x, y)
 
 
 # Bei Maus Drag immer wieder Linien zwischen bisherigem Pfad und neuster Position der Maus setzen
@@ -62,10 +74,16 @@ def on_mouse_release(x, y, button, modifiers):
 
     if button == mouse.LEFT:
         create_line(x, y) # Linie bis zum letzten Punkt fortsetzen
-        if len(points) >= recognizer.n: # Prüfen, ob Geste aus genügend Punkten bestand (groß/lang genug ist)
+        if not recognizer.ready.is_set(): # Templates noch nicht geladen
+            status_label.text = "Templates werden noch geladen..."
+            reset()
+        elif recognizer.error: # Laden fehlgeschlagen
+            status_label.text = f"Templates konnten nicht geladen werden: {recognizer.error}"
+            reset()
+        elif stroke.num_events >= recognizer.n: # Prüfen, ob Geste aus genügend Punkten bestand (groß/lang genug ist)
             enough_points = True
             if not TRAINING_MODE:
-                name, score = recognizer.recognize(points) # Geste Erkennen lassen 
+                name, score = recognizer.recognize(stroke.points) # Geste Erkennen lassen 
                 if name is None:
                     status_label.text = "Keine Templates zum Einordnen vorhanden"
                 else:
@@ -75,14 +93,20 @@ def on_mouse_release(x, y, button, modifiers):
             status_label.text = "Zu wenig Punkte erkannt"
             reset()
 
-# Linien, aus denen die Gesten bestehen, erstellen
+# Linien, aus denen die Gesten bestehen, erstellen (eine Linie je gespeichertem Punkt, zusammengefasste Punkte verlängern die letzte Linie)
 def create_line(x, y):
-    if points:
-        x1, y1 = points[-1]
-        x2, y2 = x, y
-        line = shapes.Line(x1, y1, x2, y2, thickness=2, color=(255, 255, 255), batch=batch)
-        drawn_lines.append(line)
-        points.append((x, y))
+    result = stroke.add(x, y) # Endpunkt abspeichern (für Gestenerkennung)
+    if result == REPLACED:
+        drawn_lines[-1].x2 = x
+        drawn_lines[-1].y2 = y
+    elif result == APPENDED:
+        if len(drawn_lines) == len(stroke) - 2:
+            (x1, y1), (x2, y2) = stroke.points[-2:]
+            drawn_lines.append(shapes.Line(x1, y1, x2, y2, thickness=2, color=(255, 255, 255), batch=batch)) # Linie abspeichern
+        else: # Erfassung hat ausgedünnt -> Linien aus den verbliebenen Punkten neu aufbauen
+            drawn_lines.clear()
+            for (x1, y1), (x2, y2) in zip(stroke.points, stroke.points[1:]):
+                drawn_lines.append(shapes.Line(x1, y1, x2, y2, thickness=2, color=(255, 255, 255), batch=batch))
 
 
 # Eingabe des Namens der zu speichernden Gesten-Template
@@ -110,7 +134,7 @@ def on_key_press(symbol, modifiers):
         if TRAINING_MODE:
             if enough_points:
                 if template_name:
-                    recognizer.add_template(template_name, list(points))
+                    recognizer.add_template(template_name, list(stroke.points))
                     recognizer.save_templates_to_xml(TEMPLATES_PATH)
                     status_label.text = f"Template für '{template_name}' gespeichert"
                     reset()
@@ -119,6 +143,20 @@ def on_key_press(symbol, modifiers):
                 status_label.text = "Zu wenig Punkte!"
         else: status_label.text = "Aktiviere vor dem Zeichnen mit STRG + T den Training Modus, um Gezeichnetes als Template zu speichern"
     
+    # Aktuelle Handpose mit STRG + P als Pose-Sample speichern (Falls Trainingsmodus aktiv, Hand erkannt und ein Name eingegeben)
+    elif symbol == pyglet.window.key.P and (modifiers & pyglet.window.key.MOD_CTRL):
+        if TRAINING_MODE:
+            if hand_detector.last_hand:
+                if template_name:
+                    handedness, coords = hand_detector.last_hand
+                    pose_recognizer.add_sample(template_name, coords, handedness)
+                    pose_recognizer.save_samples_to_xml(POSES_PATH)
+                    status_label.text = f"Pose '{template_name}' gespeichert"
+                else: status_label.text = "Zuerst Template Name eingeben!"
+            else:
+                status_label.text = "Keine Hand erkannt!"
+        else: status_label.text = "Aktiviere mit STRG + T den Training Modus, um Handposen zu speichern"
+
     # Bereits gemalte Geste verwerfen mit STRG + G
     elif symbol == pyglet.window.key.D and (modifiers & pyglet.window.key.MOD_CTRL):
         if TRAINING_MODE:
@@ -133,23 +171,56 @@ def on_key_press(symbol, modifiers):
         status_label.text = "Trainingsmodus: " + ("AN" if TRAINING_MODE else "AUS")
 
 
+# Erkannte Handpose anzeigen (kommt aus dem Thread der Handerkennung)
+@window.event
+def on_pose(name, score):
+    pose_label.text = f"Pose: {name} ({score:.2f})"
+
+
 # Geste Zurücksetzen
 def reset():
     global enough_points
 
     enough_points = False
-    points.clear()
+    stroke.clear()
     drawn_lines.clear()
 
 
 @window.event
 def on_draw():
+    global first_frame_drawn
+
     window.clear()
     status_label.draw()
+    pose_label.draw()
     batch.draw()
 
     if TRAINING_MODE:
         template_name_input_label.draw()
+    draw_loading_state()
+
+    if not first_frame_drawn:
+        first_frame_drawn = True
+        print(f"Zeit bis zum ersten Frame: {(time.perf_counter() - START_TIME) * 1000:.0f} ms")
+
+
+# Anzeigen, was noch im Hintergrund geladen wird (bzw. was beim Laden fehlgeschlagen ist)
+def draw_loading_state():
+    loading = []
+    if not recognizer.ready.is_set():
+        loading.append("Templates")
+    if not hand_detector.ready.is_set():
+        loading.append("Handerkennung")
+    messages = []
+    if recognizer.error:
+        messages.append(f"Fehler beim Laden der Templates: {recognizer.error}")
+    if hand_detector.error:
+        messages.append(f"Fehler beim Laden der Handerkennung: {hand_detector.error}")
+    if loading:
+        messages.append(f"Lade {' und '.join(loading)}...")
+    if messages:
+        loading_label.text = " | ".join(messages)
+        loading_label.draw()
 
 
 pyglet.app.run()
@@ -0,0 +1,179 @@
+# Gesten-Spotting: Erkennt Gesten direkt im fortlaufenden Strom der Fingerspitzenpositionen, ohne Start/Ende per Pinch
+import math
+import queue
+import threading
+from collections import deque
+
+BUFFER_SIZE = 120 # Anzahl gemerkter Positionen (ca. 4s bei 30 FPS)
+MIN_POINTS = 16 # Min Anzahl Punkte eines Kandidaten
+MIN_PATH_LENGTH = 200 # Min Pfadlänge eines Kandidaten in px
+MAX_PATH_LENGTH = 2000 # Max Pfadlänge eines Kandidaten in px
+MIN_SIZE = 60 # Min Breite bzw. Höhe der Bounding Box eines Kandidaten in px
+MIN_THICKNESS = 0.1 # Min Verhältnis Neben- zu Hauptachse der Punktwolke (fast gerade Linien lassen sich nicht normalisieren)
+PAUSE_POINTS = 6 # Über so viele Punkte wird geprüft, ob die Hand zur Ruhe gekommen ist (Ende einer Geste)
+PAUSE_LENGTH = 30 # Max Pfadlänge über PAUSE_POINTS Punkte, die noch als Ruhe gilt, in px
+MAX_CANDIDATES = 8 # Max Anzahl Fenster, die pro Pause an den Recognizer gehen
+SCORE_THRESHOLD = 0.9 # Min Score, ab dem eine Geste als erkannt gilt
+
+
+class GestureSpotter:
+
+    def __init__(self, recognizer, allowed=None, buffer_size=BUFFER_SIZE, min_points=MIN_POINTS,
+                 min_path_length=MIN_PATH_LENGTH, max_path_length=MAX_PATH_LENGTH, min_size=MIN_SIZE, min_thickness=MIN_THICKNESS,
+                 pause_points=PAUSE_POINTS, pause_length=PAUSE_LENGTH, max_candidates=MAX_CANDIDATES, score_threshold=SCORE_THRESHOLD):
+        self.recognizer = recognizer # Alles mit recognize_batch(strokes, allowed), z.B. OneDollarRecognizer oder ein Client des Erkennungsdienstes
+        self.allowed = allowed
+        self.min_points = min_points
+        self.min_path_length = min_path_length
+        self.max_path_length = max_path_length
+        self.min_size = min_size
+        self.min_thickness = min_thickness
+        self.pause_points = pause_points
+        self.pause_length = pause_length
+        self.max_candidates = max_candidates
+        self.score_threshold = score_threshold
+
+        self.points = deque(maxlen=buffer_size) # Ringpuffer der letzten Positionen
+        self.cum_lengths = deque(maxlen=buffer_size) # Bisherige Gesamtpfadlänge bei jedem Punkt -> Pfadlänge eines Fensters in O(1)
+        self.total_length = 0.0
+        self.count = 0 # Anzahl bisher hinzugefügter Punkte (absoluter Index des nächsten Punkts)
+        self.motion_start = None # Absoluter Index, an dem die Hand sich nach der letzten Ruhe wieder bewegt hat
+        self.paused = True # Hand ruht gerade (bereits geprüft) -> erst nach neuer Bewegung wieder prüfen
+
+        # Erkennung läuft in eigenem Thread, damit die Handerkennung nie auf Recognizer bzw. Erkennungsdienst wartet
+        self.evaluations = queue.Queue(maxsize=1) # Höchstens eine wartende Prüfung, weitere Pausen werden solange übersprungen
+        self.result = None # Vom Thread erkannte Geste, wird beim nächsten add_point geliefert
+        self.lock = threading.Lock()
+        threading.Thread(target=self.run, daemon=True).start()
+
+
+    # Neue Fingerspitzenposition hinzufügen, liefert (name, score) wenn eine Geste erkannt wurde, sonst None
+    # (Ergebnisse kommen aus dem Erkennungs-Thread, also frühestens beim auf die Pause folgenden Punkt)
+    def add_point(self, x, y):
+        with self.lock:
+            result, self.result = self.result, None
+        if result:
+            self.reset() # Erkannte Geste nicht noch einmal in späteren Fenstern erkennen
+            self.add_point(x, y) # Punkt gehört schon zur nächsten Bewegung
+            return result
+
+        if self.points:
+            last_x, last_y = self.points[-1]
+            self.total_length += ((x - last_x) ** 2 + (y - last_y) ** 2) ** 0.5
+        self.points.append((x, y))
+        self.cum_lengths.append(self.total_length)
+        self.count += 1
+
+        # Vorfilter: Nur prüfen, wenn die Hand nach einer Bewegung zur Ruhe kommt (Ende einer möglichen Geste)
+        if len(self.points) <= self.pause_points:
+            return None
+        resting = self.cum_lengths[-1] - self.cum_lengths[-1 - self.pause_points] < self.pause_length
+        if not resting:
+            if self.paused or self.motion_start is None:
+                self.motion_start = self.count - 2 # Letzter Punkt vor der Bewegung = wahrscheinlicher Gestenanfang
+            self.paused = False
+            return None
+        if self.paused:
+            return None
+        self.paused = True
+
+        # Templates noch nicht geladen (z.B. BackgroundRecognizer) -> nicht prüfen statt zu warten
+        ready = getattr(self.recognizer, "ready", None)
+        if ready is not None and not ready.is_set():
+            return None
+
+        candidates = self.candidate_windows()
+        if candidates:
+            try:
+                self.evaluations.put_nowait(candidates)
+            except queue.Full: # Vorherige Prüfung läuft noch
+                pass
+        return None
+
+
+    # Erkennungs-Thread: Kandidaten prüfen und beste Geste über dem Schwellwert für add_point ablegen
+    def run(self):
+        while True:
+            candidates = self.evaluations.get()
+
+            # Fehler bei der Erkennung (z.B. Recognizer nicht verfügbar) überspringen nur diese Prüfung, nicht die Handerkennung
+            try:
+                results = self.recognizer.recognize_batch(candidates, self.allowed)
+            except Exception as e:
+                print(f"Spotting: Erkennung fehlgeschlagen ({e})")
+                continue
+
+            name, score = max(results, key=lambda result: result[1])
+            if name is not None and score >= self.score_threshold:
+                with self.lock:
+                    self.result = (name, score)
+
+
+    # Fenster, die mit der Ruhephase enden und die Vorfilter (Punktanzahl, Pfadlänge, Größe) bestehen
+    def candidate_windows(self):
+        points = list(self.points)
+        end = len(points) - self.pause_points # Ruhende Punkte am Ende weglassen
+        if end < self.min_points:
+            return []
+
+        # Startpunkte mit passender Pfadlänge (Pfadlänge nimmt zum Anfang des Puffers hin zu)
+        starts = []
+        for start in range(end - self.min_points, -1, -1):
+            length = self.cum_lengths[end - 1] - self.cum_lengths[start]
+            if length > self.max_path_length:
+                break
+            if length >= self.min_path_length:
+                starts.append(start)
+        if not starts:
+            return []
+
+        # Gleichmäßig verteilt auf max_candidates Fenster ausdünnen (längstes Fenster immer dabei)
+        if len(starts) > self.max_candidates:
+            if self.max_candidates == 1:
+                starts = [starts[-1]]
+            else:
+                step = (len(starts) - 1) / (self.max_candidates - 1)
+                starts = [starts[round(i * step)] for i in range(self.max_candidates)]
+
+        # Fenster ab dem Bewegungsbeginn (und direkt daneben) immer prüfen
+        if self.motion_start is not None:
+            onset = self.motion_start - (self.count - len(points))
+            starts += [start for start in range(onset - 1, onset + 2) if 0 <= start <= end - self.min_points and start not in starts]
+
+        candidates = []
+        for start in starts:
+            window = points[start:end]
+            xs = [p[0] for p in window]
+            ys = [p[1] for p in window]
+            width, height = max(xs) - min(xs), max(ys) - min(ys)
+            if width < self.min_size and height < self.min_size: # Zu klein
+                continue
+            if self.thickness(window) < self.min_thickness: # Fast gerade Linie (auch schräg) -> nach Rotation nicht skalierbar
+                continue
+            candidates.append(window)
+
+        return candidates
+
+
+    # Verhältnis der Streuung quer zur Hauptrichtung zur Streuung entlang der Hauptrichtung (0 = gerade Linie), unabhängig von der Drehung
+    def thickness(self, points):
+        n = len(points)
+        mx = sum(p[0] for p in points) / n
+        my = sum(p[1] for p in points) / n
+        sxx = sum((p[0] - mx) ** 2 for p in points) / n
+        syy = sum((p[1] - my) ** 2 for p in points) / n
+        sxy = sum((p[0] - mx) * (p[1] - my) for p in points) / n
+
+        # Eigenwerte der 2x2 Kovarianzmatrix
+        mean = (sxx + syy) / 2
+        spread = math.sqrt(((sxx - syy) / 2) ** 2 + sxy ** 2)
+        if mean + spread == 0:
+            return 0.0
+        return math.sqrt(max(mean - spread, 0.0) / (mean + spread))
+
+
+    def reset(self):
+        self.points.clear()
+        self.cum_lengths.clear()
+        self.motion_start = None
+        self.paused = True
@@ -1,6 +1,12 @@
-import cv2
-import mediapipe as mp
-from pynput.mouse import Controller, Button
+import threading
+import time
+import numpy as np
+
+# Schwere Module (cv2, mediapipe, pynput) werden erst in HandDetection.load() importiert, damit Anwendungen schnell starten
+cv2 = None
+mp = None
+Controller = None
+Button = None
 
 SHOW_CAM = True
 DRAWING_THRESHOLD = 30 # Max Abstand Zeigefinger zu Daumen zum Auslösen des Malens in px
@@ -9,33 +15,93 @@ DEBUG = True # Anzeige von Prints, Landmarks etc.
 NUM_HANDS = 1
 DETECTION_CONFIDENCE = 0.7
 TRACKING_CONFIDENCE = 0.7
+POSE_HOLD_FRAMES = 5 # So viele Frames in Folge muss eine Handpose erkannt werden, bevor sie gemeldet wird
+STATS_SMOOTHING = 0.1 # Glättungsfaktor für FPS und Inferenzzeit (exponentieller gleitender Mittelwert)
 
 
 class HandDetection:
 
-    def __init__(self, num_hands=1, detection_confidence=0.7, tracking_confidence=0.7, drawing_threshold=30, show_cam=True, debug=False):
-        self.detector = mp.solutions.hands.Hands(
-            static_image_mode=False,
-            max_num_hands=num_hands,
-            min_detection_confidence=detection_confidence,
-            min_tracking_confidence=tracking_confidence
-        )
-        self.cap = cv2.VideoCapture(0)
+    def __init__(self, num_hands=1, detection_confidence=0.7, tracking_confidence=0.7, drawing_threshold=30, show_cam=True, debug=False, spotter=None, on_gesture=None, pose_recognizer=None, on_pose=None):
+        self.num_hands = num_hands
+        self.detection_confidence = detection_confidence
+        self.tracking_confidence = tracking_confidence
+        self.detector = None
+        self.cap = None
         self.show_cam = show_cam
         self.running = False
+        self.error = None # Fehler beim Laden (fehlende Module, keine Kamera)
+        self.ready = threading.Event() # Gesetzt, sobald das Laden abgeschlossen ist (erfolgreich oder mit error)
 
         self.drawing = False
         self.drawing_threshold = drawing_threshold
 
-        self.mouse = Controller()
+        # Spotting-Modus: Gesten direkt aus der Fingerspitzenbewegung erkennen statt per Pinch zu zeichnen
+        self.spotter = spotter # GestureSpotter oder None
+        self.on_gesture = on_gesture # Wird mit (name, score) aufgerufen, sobald der Spotter eine Geste erkennt
+
+        # Handposen als Befehle
+        self.pose_recognizer = pose_recognizer # PoseRecognizer oder None
+        self.on_pose = on_pose # Wird mit (name, score) aufgerufen, sobald eine neue Pose stabil erkannt wird
+        self.pose = None # Zuletzt gemeldete Pose
+        self.pose_candidate = None
+        self.pose_frames = 0
+        self.last_hand = None # Zuletzt erkannte Hand als (handedness, coords), z.B. zum Aufnehmen von Pose-Samples
+
+        self.mouse = None
         self.screen_w = 1920
         self.screen_h = 1080
 
         self.debug = debug
+        self.preview = None # DebugPreview, zeigt das Kamerabild in eigenem Thread (falls show_cam)
+        self.logger = None # RateLimitedLogger für Debug-Ausgaben
+        self.fps = 0.0
+        self.inference_ms = 0.0
+
+
+    # Module importieren, Detektor und Kamera öffnen und eine Aufwärm-Erkennung machen (läuft im Thread von run())
+    def load(self):
+        global cv2, mp, Controller, Button
+        try:
+            import cv2
+            import mediapipe as mp
+            from pynput.mouse import Controller, Button
+
+            self.detector = mp.solutions.hands.Hands(
+                static_image_mode=False,
+                max_num_hands=self.num_hands,
+                min_detection_confidence=self.detection_confidence,
+                min_tracking_confidence=self.tracking_confidence
+            )
+            self.cap = cv2.VideoCapture(0)
+            if not self.cap.isOpened():
+                raise RuntimeError("Kamera konnte nicht geöffnet werden")
+            self.mouse = Controller()
+
+            from preview import DebugPreview, RateLimitedLogger
+            self.logger = RateLimitedLogger()
+            if self.show_cam:
+                self.preview = DebugPreview(draw_overlays=self.debug, on_quit=self.stop)
+                self.preview.start()
+
+            # Erste Inferenz ist langsam (Graph-Aufbau) -> mit leerem Bild vorwegnehmen
+            self.detector.process(np.zeros((480, 640, 3), dtype=np.uint8))
+        except Exception as e:
+            print(f"Handerkennung konnte nicht geladen werden: {e}")
+            self.error = e
+            if self.preview:
+                self.preview.stop()
+            if self.cap is not None:
+                self.cap.release()
+        self.ready.set()
 
 
     def run(self):
+        if not self.ready.is_set():
+            self.load()
+        if self.error:
+            return
         self.running = True
+        last_frame_time = time.perf_counter()
         while self.running:
             success, frame = self.cap.read()
             if not success:
@@ -44,9 +110,20 @@ class HandDetection:
             frame = cv2.flip(frame, 1)
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
+            inference_start = time.perf_counter()
             success, data = self.detect(frame_rgb, frame.shape)
+            self.update_stats(inference_start, last_frame_time)
+            last_frame_time = time.perf_counter()
+
             if success:
                 for handedness, (coords, landmark_data) in data.items():
+                    self.last_hand = (handedness, coords)
+                    if self.pose_recognizer:
+                        # Fehler bei der Posenerkennung überspringen nur diesen Frame, nicht die Handerkennung
+                        try:
+                            self.update_pose(*self.pose_recognizer.recognize(coords, handedness))
+                        except Exception as e:
+                            self.logger.log(f"Posenerkennung fehlgeschlagen ({e})")
 
                     if len(coords) >= 9:
                             index_tip = coords[8] # Zeigefingerspitze Koordinaten 
@@ -59,30 +136,65 @@ class HandDetection:
                             mapped_x, mapped_y = self.map_to_screen(index_tip[0], index_tip[1], frame.shape)
                             self.mouse.position = (mapped_x, mapped_y) # Mausposition setzen
 
+                            # Spotting-Modus: Position (y nach oben wie in pyglet) an den Spotter geben, kein Pinch-Zeichnen
+                            if self.spotter:
+                                result = self.spotter.add_point(index_tip[0], frame.shape[0] - index_tip[1])
+                                if result and self.on_gesture:
+                                    self.on_gesture(*result)
+
                             # Zeigefinger berührt Daumen -> Mausklick -> Zeichnen aktiviert
-                            if distance < self.drawing_threshold:
+                            elif distance < self.drawing_threshold:
                                 if not self.drawing:
                                     print("Zeichnen aktiviert")
+                                    self.drawing = True
                                 self.mouse.press(Button.left)
                             else:
                                 if self.drawing:
                                     print("Zeichnen deaktiviert")
+                                    self.drawing = False
                                 self.mouse.release(Button.left)
 
-                    # Debug-Anzeigen 
+                    # Debug-Ausgaben (gedrosselt, Overlays zeichnet die Vorschau)
                     if self.debug:
-                        print(f"{handedness} hand detected. Index fingertip: {coords[8]}")
-                        self.draw_landmarks(frame, landmark_data)
-                        cv2.circle(frame, coords[8], 10, (0, 255, 0), -1)  # Zeigefingerspitze in grün
-                        cv2.putText(frame, f"Drawing: {self.drawing}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if self.drawing else (0, 0, 255), 2)
+                        self.logger.log(f"{handedness} hand detected. Index fingertip: {coords[8]} | {self.fps:.1f} FPS, Inferenz {self.inference_ms:.1f} ms")
+            else:
+                if self.spotter:
+                    self.spotter.reset() # Hand verloren -> Bewegung unterbrochen
+                if self.pose_recognizer:
+                    self.update_pose(None, 0.0)
             
-            # Kamerabild zeigen (falls gewollt)
-            if self.show_cam:
-                cv2.imshow("Handkamera", frame)
-                if cv2.waitKey(1) & 0xFF == ord("q"):
-                    self.running = False
-                    self.cap.release()
-                    cv2.destroyAllWindows()
+            # Kamerabild an die Vorschau übergeben (falls gewollt), gezeichnet wird dort mit eigener Rate
+            if self.preview:
+                self.preview.publish(frame, data, self.drawing, self.fps, self.inference_ms)
+
+        self.cap.release()
+
+
+    def stop(self):
+        self.running = False
+        if self.preview:
+            self.preview.stop()
+
+
+    def update_stats(self, inference_start, last_frame_time):
+        now = time.perf_counter()
+        inference_ms = (now - inference_start) * 1000
+        fps = 1.0 / max(now - last_frame_time, 1e-6)
+        self.inference_ms += STATS_SMOOTHING * (inference_ms - self.inference_ms)
+        self.fps += STATS_SMOOTHING * (fps - self.fps)
+
+
+    # Pose erst melden, wenn sie einige Frames in Folge erkannt wurde (verhindert Flackern)
+    def update_pose(self, name, score):
+        if name != self.pose_candidate:
+            self.pose_candidate = name
+            self.pose_frames = 0
+        self.pose_frames += 1
+
+        if self.pose_frames >= POSE_HOLD_FRAMES and name != self.pose:
+            self.pose = name
+            if name is not None and self.on_pose:
+                self.on_pose(name, score)
 
 
     def detect(self, img_rgb, shape):
@@ -108,12 +220,6 @@ class HandDetection:
         return True, hand_data
 
 
-    def draw_landmarks(self, img, landmarks):
-        mp.solutions.drawing_utils.draw_landmarks(
-            img, landmarks, mp.solutions.hands.HAND_CONNECTIONS
-        )
-
-
     # Handposition im Kamerabild auf Bildschirmgröße übertragen
     def map_to_screen(self, x, y, frame_shape):
         frame_h, frame_w, _ = frame_shape
@@ -0,0 +1,104 @@
+# Erkennung statischer Handposen aus den 21 MediaPipe Landmarks (k-nächste Nachbarn über eine vektorisierte Distanzmatrix)
+import threading
+import numpy as np
+from collections import Counter
+from recognizer import save_gestures_to_xml, load_gestures_from_xml
+
+POSES_PATH = "poses"
+NUM_LANDMARKS = 21
+WRIST = 0
+MIDDLE_FINGER_MCP = 9 # Grundgelenk Mittelfinger, Abstand zum Handgelenk dient als Maßstab der Hand
+K = 3 # Anzahl nächster Nachbarn für die Mehrheitsentscheidung
+MAX_DISTANCE = 0.35 # Max mittlerer Landmark-Abstand (in Handgrößen), bis zu dem eine Pose noch erkannt wird
+
+
+class PoseRecognizer:
+
+    def __init__(self, poses_path=POSES_PATH, subject="1", k=K, max_distance=MAX_DISTANCE):
+        self.subject = subject
+        self.k = k
+        self.max_distance = max_distance
+        self.samples = [] # (name, rohe Landmark-Koordinaten) zum Abspeichern
+        self.sample_names = []
+        self.normalized_samples = []
+        self.sample_matrix = None # Alle normalisierten Samples als (S, 21, 2) Array (wird bei Bedarf gebaut)
+        self.lock = threading.Lock() # Samples kommen aus dem GUI-Thread (STRG + P), erkannt wird im Thread der Handerkennung
+
+        self.load_samples_from_xml(poses_path)
+
+
+    # Pose-Sample (21 Landmark-Koordinaten im Kamerabild) zur Bibliothek hinzufügen
+    def add_sample(self, name, coords, handedness="Right"):
+        points = np.asarray(coords, dtype=float)
+        if handedness == "Left": # Gespiegelt als rechte Hand speichern
+            points[:, 0] = 2 * points[WRIST, 0] - points[:, 0]
+        normalized = self.normalize(points)
+        with self.lock:
+            self.samples.append((name, [tuple(p) for p in points.tolist()]))
+            self.sample_names.append(name)
+            self.normalized_samples.append(normalized)
+            self.sample_matrix = None # Array bei der nächsten Erkennung neu aufbauen
+
+
+    # Pose erkennen lassen, liefert (name, score) bzw. (None, 0.0) wenn keine Pose nah genug ist
+    def recognize(self, coords, handedness="Right"):
+        return self.recognize_batch([coords], [handedness])[0]
+
+
+    # Mehrere Hände auf einmal erkennen: Abstände aller Hände zu allen Samples als (B, S) Matrix
+    def recognize_batch(self, coords_list, handedness_list=None):
+        if handedness_list is None:
+            handedness_list = ["Right"] * len(coords_list)
+        # Matrix und Namen gemeinsam unter dem Lock holen, damit sie zueinander passen, auch wenn gleichzeitig ein Sample hinzukommt
+        with self.lock:
+            if not self.sample_names:
+                return [(None, 0.0) for _ in coords_list]
+            if self.sample_matrix is None:
+                self.sample_matrix = np.array(self.normalized_samples)
+            sample_matrix = self.sample_matrix
+            sample_names = list(self.sample_names)
+
+        queries = np.array([self.normalize(coords, handedness) for coords, handedness in zip(coords_list, handedness_list)])
+        distances = np.linalg.norm(queries[:, None] - sample_matrix[None], axis=3).mean(axis=2) # Mittlerer Landmark-Abstand
+
+        k = min(self.k, len(sample_names))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, neighbours in zip(distances, nearest):
+            neighbours = sorted(neighbours, key=lambda i: row[i])
+            votes = Counter(sample_names[i] for i in neighbours) # Nach Abstand eingefügt -> bei Gleichstand gewinnt der Nächste
+            name = max(votes, key=votes.get)
+            d = min(row[i] for i in neighbours if sample_names[i] == name)
+            if d > self.max_distance:
+                results.append((None, 0.0))
+            else:
+                results.append((name, float(1 - d / self.max_distance)))
+
+        return results
+
+
+    # Handgelenk in den Ursprung, auf Handgröße skalieren, linke Hände spiegeln (eine Bibliothek für beide Hände)
+    def normalize(self, coords, handedness="Right"):
+        points = np.asarray(coords, dtype=float)
+        points = points - points[WRIST]
+        if handedness == "Left":
+            points[:, 0] = -points[:, 0]
+        scale = np.linalg.norm(points[MIDDLE_FINGER_MCP])
+        if scale == 0:
+            return points
+        return points / scale
+
+
+# XML EXPORT UND IMPORT DER POSE-SAMPLES (gleiches Format wie die Gesten-Templates) ##########
+
+    def save_samples_to_xml(self, directory):
+        with self.lock:
+            samples = list(self.samples)
+        save_gestures_to_xml(directory, samples, self.subject, app_name="PoseRecognizer")
+
+
+    def load_samples_from_xml(self, directory):
+        for filename, name, points in load_gestures_from_xml(directory, NUM_LANDMARKS):
+            self.add_sample(name, points[:NUM_LANDMARKS])
+            print(f"Pose {filename} erfolgreich hinzugefügt.")
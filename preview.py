@@ -0,0 +1,85 @@
+# Debug-Vorschau der Handkamera: Zeichnet Overlays in eigenem Thread mit begrenzter Rate, damit die Handerkennung nicht ausgebremst wird
+import threading
+import time
+import cv2
+import mediapipe as mp
+
+PREVIEW_FPS = 15 # Max Bildrate der Vorschau
+LOG_INTERVAL = 1.0 # Min Abstand zwischen zwei Debug-Ausgaben in s
+
+
+# Gibt Meldungen höchstens alle interval Sekunden aus und zählt die dazwischen unterdrückten
+class RateLimitedLogger:
+
+    def __init__(self, interval=LOG_INTERVAL):
+        self.interval = interval
+        self.last_time = 0.0
+        self.suppressed = 0
+
+
+    def log(self, message):
+        now = time.perf_counter()
+        if now - self.last_time < self.interval:
+            self.suppressed += 1
+            return
+        if self.suppressed:
+            message = f"{message} (+{self.suppressed} unterdrückt)"
+        print(message)
+        self.last_time = now
+        self.suppressed = 0
+
+
+class DebugPreview:
+
+    def __init__(self, draw_overlays=True, fps=PREVIEW_FPS, on_quit=None):
+        self.draw_overlays = draw_overlays # Landmarks, Zeigefingerspitze und Zeichenstatus einzeichnen
+        self.interval = 1.0 / fps
+        self.on_quit = on_quit # Wird aufgerufen, wenn im Vorschaufenster q gedrückt wird
+        self.lock = threading.Lock()
+        self.latest = None # Zuletzt veröffentlichter Stand (frame, hand_data, drawing, stats)
+        self.running = False
+
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+
+    # Vom Erkennungs-Thread aufgerufen: nur Referenzen merken, gezeichnet wird im Vorschau-Thread
+    def publish(self, frame, hand_data, drawing, fps, inference_ms):
+        with self.lock:
+            self.latest = (frame, hand_data, drawing, fps, inference_ms)
+
+
+    def run(self):
+        while self.running:
+            start = time.perf_counter()
+            with self.lock:
+                latest = self.latest
+
+            if latest is not None:
+                cv2.imshow("Handkamera", self.render(*latest))
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                self.running = False
+                if self.on_quit:
+                    self.on_quit()
+
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+        cv2.destroyAllWindows()
+
+
+    def render(self, frame, hand_data, drawing, fps, inference_ms):
+        img = frame.copy() # Veröffentlichtes Bild nicht verändern (kann mehrfach gerendert werden)
+        if self.draw_overlays:
+            for coords, landmark_data in hand_data.values():
+                mp.solutions.drawing_utils.draw_landmarks(img, landmark_data, mp.solutions.hands.HAND_CONNECTIONS)
+                cv2.circle(img, coords[8], 10, (0, 255, 0), -1) # Zeigefingerspitze in grün
+            cv2.putText(img, f"Drawing: {drawing}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if drawing else (0, 0, 255), 2)
+
+        cv2.putText(img, f"{fps:.1f} FPS | Inferenz {inference_ms:.1f} ms", (10, img.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        return img
+
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,432 @@
+# Lokaler Erkennungsdienst: Hält die Templates einmal warm im Speicher und bündelt gleichzeitige Anfragen mehrerer Clients zu Batches
+import json
+import math
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from recognizer import OneDollarRecognizer
+
+HOST = "127.0.0.1"
+PORT = 50066
+TEMPLATE_SETS = ["templates", "spells"] # Template-Ordner, die der Dienst beim Start lädt
+SUBJECT = "1"
+RESAMPLE_POINTS = 64
+BB_SIZE = 250
+
+MAX_BATCH_SIZE = 32 # Max Anzahl Gesten pro Batch
+MAX_BATCH_WAIT = 0.005 # Max Wartezeit in s auf weitere Anfragen, bevor ein Batch abgearbeitet wird (begrenzt die Latenz)
+REQUEST_TIMEOUT = 2.0 # Max Wartezeit des Clients auf eine Antwort in s
+
+
+class BatchingRecognizer:
+
+    def __init__(self, recognizers, max_batch_size=MAX_BATCH_SIZE, max_batch_wait=MAX_BATCH_WAIT):
+        self.recognizers = recognizers # {Template-Ordner: OneDollarRecognizer}
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.requests = queue.Queue()
+        self.lock = threading.Lock() # Schützt die Template-Stores beim Hinzufügen neuer Templates während der Erkennung
+
+        # Metriken
+        self.batch_sizes = Counter()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.num_requests = 0
+        self.latencies = deque(maxlen=1000) # Letzte Antwortzeiten in s
+
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+
+    # Geste zur Erkennung einreihen (optional nur gegen die Klassen in allowed), liefert ein Future mit (name, score)
+    def submit(self, template_set, points, allowed=None):
+        future = Future()
+        allowed = frozenset(allowed) if allowed is not None else None
+        self.requests.put(((template_set, allowed), list(points), future, time.perf_counter()))
+        return future
+
+
+    def recognize(self, template_set, points, timeout=None, allowed=None):
+        return self.submit(template_set, points, allowed).result(timeout)
+
+
+    def recognize_batch(self, template_set, strokes, timeout=None, allowed=None):
+        futures = [self.submit(template_set, points, allowed) for points in strokes]
+        return [future.result(timeout) for future in futures]
+
+
+    def add_template(self, template_set, name, points):
+        with self.lock:
+            self.recognizers[template_set].add_template(name, points)
+
+
+    def save_templates_to_xml(self, template_set, directory):
+        with self.lock:
+            self.recognizers[template_set].save_templates_to_xml(directory)
+
+
+    def info(self, template_set):
+        recognizer = self.recognizers[template_set]
+        return {"n": recognizer.n, "size": recognizer.size, "templates": len(recognizer.templates)}
+
+
+    # Anfragen sammeln bis Batch voll oder Wartezeit abgelaufen, dann gesammelt erkennen
+    def run(self):
+        while self.running:
+            request = self.requests.get()
+            if request is None: # Von stop() eingereiht
+                break
+            batch = [request]
+            deadline = time.perf_counter() + self.max_batch_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None: # Bereits gesammelte Anfragen noch abarbeiten, dann beenden
+                    self.running = False
+                    break
+                batch.append(request)
+
+            self.queue_depth = self.requests.qsize()
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth + len(batch))
+            self.batch_sizes[len(batch)] += 1
+            self.num_requests += len(batch)
+            self.process(batch)
+
+
+    def process(self, batch):
+        # Nach Template-Ordner und erlaubten Klassen gruppieren, da jede Gruppe gegen andere Templates gematcht wird
+        groups = {}
+        for request in batch:
+            groups.setdefault(request[0], []).append(request)
+
+        for (template_set, allowed), requests in groups.items():
+            recognizer = self.recognizers.get(template_set)
+            if recognizer is None:
+                for _, _, future, _ in requests:
+                    future.set_exception(KeyError(f"Unbekannte Templates: {template_set}"))
+                continue
+
+            # Jede Geste einzeln normalisieren, damit eine fehlerhafte Geste (z.B. gerade Linie) nur ihre eigene Anfrage scheitern lässt
+            valid = []
+            candidates = []
+            for request in requests:
+                try:
+                    candidates.append(recognizer.normalize(request[1]))
+                    valid.append(request)
+                except Exception as e:
+                    request[2].set_exception(e)
+
+            try:
+                with self.lock:
+                    results = recognizer.recognize_normalized_batch(candidates, allowed)
+            except Exception as e:
+                for _, _, future, _ in valid:
+                    future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for (_, _, future, start), result in zip(valid, results):
+                self.latencies.append(now - start)
+                future.set_result(result)
+
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        num_batches = sum(self.batch_sizes.values())
+        return {
+            "requests": self.num_requests,
+            "batches": num_batches,
+            "mean_batch_size": self.num_requests / num_batches if num_batches else 0.0,
+            "batch_sizes": dict(self.batch_sizes),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "p50_latency_ms": 1000 * latencies[len(latencies) // 2] if latencies else 0.0,
+            "p99_latency_ms": 1000 * latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        }
+
+
+    # Thread beenden (None weckt ihn auch, wenn er gerade auf eine Anfrage wartet)
+    def stop(self):
+        self.running = False
+        self.requests.put(None)
+
+
+# SERVER #################################################################################
+
+class RecognitionRequestHandler(socketserver.StreamRequestHandler):
+
+    # Eine JSON-Nachricht pro Zeile, z.B. {"cmd": "recognize", "set": "spells", "points": [[x, y], ...], "allowed": ["lumos"]}
+    def handle(self):
+        batcher = self.server.batcher
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                cmd = request.get("cmd", "recognize")
+                template_set = request.get("set")
+
+                if cmd == "recognize":
+                    name, score = batcher.recognize(template_set, [tuple(p) for p in request["points"]], allowed=request.get("allowed"))
+                    response = {"name": name, "score": score}
+                elif cmd == "recognize_batch":
+                    strokes = [[tuple(p) for p in points] for points in request["strokes"]]
+                    results = batcher.recognize_batch(template_set, strokes, allowed=request.get("allowed"))
+                    response = {"results": results}
+                elif cmd == "add":
+                    batcher.add_template(template_set, request["name"], [tuple(p) for p in request["points"]])
+                    response = {"ok": True}
+                elif cmd == "save":
+                    # Nur in den Ordner des Template-Sets selbst speichern, Clients dürfen keine beliebigen Pfade beschreiben
+                    directory = request.get("directory", template_set)
+                    if template_set not in batcher.recognizers or os.path.normpath(directory) != os.path.normpath(template_set):
+                        raise PermissionError(f"Speichern nur in den Ordner des Template-Sets erlaubt: {template_set}")
+                    batcher.save_templates_to_xml(template_set, template_set)
+                    response = {"ok": True}
+                elif cmd == "info":
+                    response = batcher.info(template_set)
+                elif cmd == "metrics":
+                    response = batcher.metrics()
+                else:
+                    response = {"error": f"Unbekannter Befehl: {cmd}"}
+            except Exception as e:
+                response = {"error": str(e)}
+
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+class RecognitionService(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, batcher, host=HOST, port=PORT):
+        self.batcher = batcher
+        super().__init__((host, port), RecognitionRequestHandler)
+
+
+# CLIENTS ################################################################################
+
+class RecognitionClient:
+
+    def __init__(self, templates_path, host=HOST, port=PORT, timeout=REQUEST_TIMEOUT):
+        self.templates_path = templates_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.file = None
+        self.lock = threading.Lock()
+
+        try:
+            info = self.request({"cmd": "info"})
+        except Exception:
+            self.close()
+            raise
+        self.n = info["n"]
+        self.size = info["size"]
+
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.file = self.sock.makefile("rwb")
+
+
+    def request(self, message):
+        message["set"] = self.templates_path
+        with self.lock:
+            if self.sock is None:
+                self.connect()
+            try:
+                self.file.write((json.dumps(message) + "\n").encode("utf-8"))
+                self.file.flush()
+                line = self.file.readline()
+                if not line:
+                    raise ConnectionError("Verbindung zum Erkennungsdienst getrennt")
+                response = json.loads(line)
+            except Exception:
+                # Nach Timeout/Fehler kann noch eine verspätete Antwort im Puffer liegen -> Verbindung verwerfen, beim nächsten Mal neu verbinden
+                self.close()
+                raise
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+
+    def recognize(self, points, allowed=None):
+        message = {"cmd": "recognize", "points": [list(p) for p in points]}
+        if allowed is not None:
+            message["allowed"] = list(allowed)
+        response = self.request(message)
+        return response["name"], response["score"]
+
+
+    def recognize_batch(self, strokes, allowed=None):
+        message = {"cmd": "recognize_batch", "strokes": [[list(p) for p in points] for points in strokes]}
+        if allowed is not None:
+            message["allowed"] = list(allowed)
+        response = self.request(message)
+        return [tuple(result) for result in response["results"]]
+
+
+    def add_template(self, name, points):
+        self.request({"cmd": "add", "name": name, "points": [list(p) for p in points]})
+
+
+    def save_templates_to_xml(self, directory):
+        self.request({"cmd": "save", "directory": directory})
+
+
+    def metrics(self):
+        return self.request({"cmd": "metrics"})
+
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        if self.sock:
+            self.sock.close()
+        self.file = None
+        self.sock = None
+
+
+# Lokaler Ersatz ohne Socket (z.B. für Tests), gleiche Schnittstelle wie RecognitionClient
+class LocalRecognitionClient:
+
+    def __init__(self, templates_path, bb_size=BB_SIZE, resample_points=RESAMPLE_POINTS, subject=SUBJECT, batcher=None):
+        self.templates_path = templates_path
+        if batcher is None:
+            batcher = BatchingRecognizer({templates_path: OneDollarRecognizer(bb_size, resample_points, templates_path, subject)})
+        self.batcher = batcher
+        self.n = batcher.recognizers[templates_path].n
+        self.size = batcher.recognizers[templates_path].size
+
+
+    def recognize(self, points, allowed=None):
+        return self.batcher.recognize(self.templates_path, points, REQUEST_TIMEOUT, allowed)
+
+
+    def recognize_batch(self, strokes, allowed=None):
+        return self.batcher.recognize_batch(self.templates_path, strokes, REQUEST_TIMEOUT, allowed)
+
+
+    def add_template(self, name, points):
+        self.batcher.add_template(self.templates_path, name, points)
+
+
+    def save_templates_to_xml(self, directory):
+        self.batcher.save_templates_to_xml(self.templates_path, directory)
+
+
+    def metrics(self):
+        return self.batcher.metrics()
+
+
+    def close(self):
+        pass
+
+
+# Mit laufendem Dienst verbinden, sonst eigenen Recognizer im Prozess anlegen
+def connect_or_local(templates_path, bb_size=BB_SIZE, resample_points=RESAMPLE_POINTS, subject=SUBJECT, host=HOST, port=PORT):
+    try:
+        client = RecognitionClient(templates_path, host, port)
+        print(f"Mit Erkennungsdienst auf {host}:{port} verbunden")
+        return client
+    except OSError:
+        print(f"Kein Erkennungsdienst auf {host}:{port} gefunden - Templates werden lokal geladen")
+    except RuntimeError as e: # Dienst läuft, kennt die Templates aber nicht
+        print(f"Erkennungsdienst auf {host}:{port} kann {templates_path} nicht liefern ({e}) - Templates werden lokal geladen")
+    return LocalRecognitionClient(templates_path, bb_size, resample_points, subject)
+
+
+# Lädt bzw. verbindet den Recognizer im Hintergrund, damit das Fenster sofort reagiert (gleiche Schnittstelle wie die Clients)
+class BackgroundRecognizer:
+
+    def __init__(self, templates_path, bb_size=BB_SIZE, resample_points=RESAMPLE_POINTS, subject=SUBJECT, host=HOST, port=PORT):
+        self.templates_path = templates_path
+        self.bb_size = bb_size
+        self.resample_points = resample_points
+        self.subject = subject
+        self.host = host
+        self.port = port
+        self.client = None
+        self.error = None # Fehler beim Laden, falls weder Dienst noch lokale Templates nutzbar sind
+        self.ready = threading.Event() # Gesetzt, sobald das Laden abgeschlossen ist (erfolgreich oder mit error)
+
+        threading.Thread(target=self.load, daemon=True).start()
+
+
+    def load(self):
+        try:
+            client = connect_or_local(self.templates_path, self.bb_size, self.resample_points, self.subject, self.host, self.port)
+
+            # Aufwärm-Erkennung mit einem Kreis, damit die erste echte Geste nicht langsamer ist
+            warmup_stroke = [(math.cos(2 * math.pi * i / client.n), math.sin(2 * math.pi * i / client.n)) for i in range(client.n)]
+            client.recognize(warmup_stroke)
+        except Exception as e:
+            print(f"Fehler beim Laden des Recognizers ({e}) - Templates werden lokal ohne Aufwärmen geladen")
+            try:
+                client = LocalRecognitionClient(self.templates_path, self.bb_size, self.resample_points, self.subject)
+            except Exception as e:
+                print(f"Templates konnten nicht geladen werden: {e}")
+                self.error = e
+                self.ready.set()
+                return
+
+        self.client = client
+        self.ready.set()
+
+
+    # Warten bis geladen, bei Ladefehler Fehler werfen statt ewig zu blockieren
+    def wait(self):
+        self.ready.wait()
+        if self.error:
+            raise RuntimeError(f"Recognizer nicht verfügbar: {self.error}")
+
+
+    @property
+    def n(self):
+        return self.client.n if self.client else self.resample_points
+
+
+    def recognize(self, points, allowed=None):
+        self.wait()
+        return self.client.recognize(points, allowed)
+
+
+    def recognize_batch(self, strokes, allowed=None):
+        self.wait()
+        return self.client.recognize_batch(strokes, allowed)
+
+
+    def add_template(self, name, points):
+        self.wait()
+        self.client.add_template(name, points)
+
+
+    def save_templates_to_xml(self, directory):
+        self.wait()
+        self.client.save_templates_to_xml(directory)
+
+
+    def metrics(self):
+        self.wait()
+        return self.client.metrics()
+
+
+if __name__ == "__main__":
+    recognizers = {path: OneDollarRecognizer(BB_SIZE, RESAMPLE_POINTS, path, SUBJECT) for path in TEMPLATE_SETS}
+    batcher = BatchingRecognizer(recognizers)
+    with RecognitionService(batcher) as service:
+        print(f"Erkennungsdienst läuft auf {HOST}:{PORT}")
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            print(f"Beendet. Metriken: {batcher.metrics()}")
@@ -1,5 +1,6 @@
 # $1 gesture recognizer (Aufgebaut nach Pseudocode auf Wobbrocks Website)
 import math, os
+import numpy as np
 import xml.etree.ElementTree as ET
 from datetime import datetime
 
@@ -13,36 +14,112 @@ class OneDollarRecognizer:
         self.n = resample_points
         self.origin = (0, 0)
         self.templates = []
+        self.templates_by_class = {} # Templates nach Gestenname partitioniert, für auf bestimmte Klassen beschränkte Erkennung
+        self.template_array = None # Alle Templates nach Klasse sortiert als (T, n, 2) Array für die Batch-Erkennung (wird bei Bedarf gebaut)
+        self.template_names = [] # Gestenname je Zeile von template_array
+        self.class_slices = {} # Gestenname -> Bereich (slice) der Templates dieser Klasse in template_array
+        self.restricted_templates = {} # frozenset(allowed) -> (Templates, Namen) der erlaubten Klassen, damit wiederholte Anfragen nicht kopieren
         self.min_angle = math.radians(-45)
         self.max_angle = math.radians(45)
         self.angle_precision = math.radians(2)
         self.subject = subject
 
         self.load_templates_from_xml(templates_path) # Beim Initialisieren gleich trainieren aus Gesten in XML Dateien
+        self.build_template_array()
 
 
     # Template zu den erkennbaren dieser Session hinzufügen
     def add_template(self, name, points):
         normalized = self.normalize(points)
         self.templates.append((name, normalized))
+        self.templates_by_class.setdefault(name, []).append(normalized)
+        self.template_array = None # Array beim nächsten Batch neu aufbauen
 
-    # Geste erkennen lassen
-    def recognize(self, points):
+    # Geste erkennen lassen (optional nur gegen die Klassen in allowed, z.B. {"lumos", "alohomora"})
+    def recognize(self, points, allowed=None):
         candidate = self.normalize(points)
         max_possible_distance = 0.5 * math.sqrt(self.size ** 2 + self.size ** 2) # Größtmöglicher Abstand zweier Punkte in der Anwendung
         current_min_distance = max_possible_distance
         best_template = None
 
         # Am besten passende Template zu eingegebener Geste finden (geringster durchschnittlicher Abstand zur Template)
-        for name, template_points in self.templates:
-            d = self.distance_at_best_angle(candidate, template_points, self.min_angle, self.max_angle, self.angle_precision)
-            if d < current_min_distance:
-                current_min_distance = d
-                best_template = name
+        for name in self.allowed_classes(allowed):
+            for template_points in self.templates_by_class[name]:
+                d = self.distance_at_best_angle(candidate, template_points, self.min_angle, self.max_angle, self.angle_precision)
+                if d < current_min_distance:
+                    current_min_distance = d
+                    best_template = name
         score = 1 - current_min_distance / max_possible_distance
 
         return best_template, score
 
+    # Mehrere Gesten auf einmal erkennen lassen (vektorisiert über alle Gesten und Templates der erlaubten Klassen)
+    def recognize_batch(self, strokes, allowed=None):
+        return self.recognize_normalized_batch([self.normalize(points) for points in strokes], allowed)
+
+    # Wie recognize_batch, aber für bereits normalisierte Gesten (z.B. wenn jede Geste einzeln normalisiert wurde)
+    def recognize_normalized_batch(self, candidates, allowed=None):
+        if not candidates:
+            return []
+        max_possible_distance = 0.5 * math.sqrt(self.size ** 2 + self.size ** 2)
+
+        if self.template_array is None:
+            self.build_template_array()
+        templates, names = self.template_slices(allowed)
+        if not names:
+            return [(None, 0.0) for _ in candidates]
+
+        candidates = np.array(candidates, dtype=float)
+        distances = self.batch_distance_at_best_angle(candidates, templates, self.min_angle, self.max_angle, self.angle_precision)
+
+        results = []
+        for row in distances:
+            best = int(np.argmin(row))
+            d = min(float(row[best]), max_possible_distance)
+            name = names[best] if row[best] < max_possible_distance else None
+            results.append((name, 1 - d / max_possible_distance))
+
+        return results
+
+
+    def allowed_classes(self, allowed):
+        if allowed is None:
+            return list(self.templates_by_class)
+        return [name for name in self.templates_by_class if name in allowed]
+
+
+    # Templates nach Klassen sortiert in ein Array legen und Bereich jeder Klasse merken
+    def build_template_array(self):
+        arrays = []
+        self.template_names = []
+        self.class_slices = {}
+        self.restricted_templates = {}
+        for name, class_templates in self.templates_by_class.items():
+            start = len(self.template_names)
+            arrays.extend(class_templates)
+            self.template_names.extend([name] * len(class_templates))
+            self.class_slices[name] = slice(start, len(self.template_names))
+        self.template_array = np.array(arrays, dtype=float).reshape(-1, self.n, 2)
+
+
+    # Nur die Bereiche der erlaubten Klassen aus template_array holen (eine Klasse -> View ohne Kopie, mehrere -> einmal zusammengefügt und gemerkt)
+    def template_slices(self, allowed):
+        if allowed is None:
+            return self.template_array, self.template_names
+        key = frozenset(allowed)
+        if key in self.restricted_templates:
+            return self.restricted_templates[key]
+
+        slices = [self.class_slices[name] for name in self.allowed_classes(key)]
+        if len(slices) == 1:
+            restricted = self.template_array[slices[0]], self.template_names[slices[0]]
+        else:
+            templates = np.concatenate([self.template_array[sl] for sl in slices]) if slices else self.template_array[:0]
+            names = [name for sl in slices for name in self.template_names[sl]]
+            restricted = templates, names
+        self.restricted_templates[key] = restricted
+        return restricted
+
 
 # NORMALISIERUNG DER GESTENPUNKTE #############################################################
 
@@ -127,8 +204,8 @@ class OneDollarRecognizer:
         max_x = max(p[0] for p in points)
         min_y = min(p[1] for p in points)
         max_y = max(p[1] for p in points)
-        width = max_x - min_x
-        height = max_y - min_y
+        width = max_x - min_x or 1.0 # Exakt gerade Striche (z.B. nach dem Zusammenfassen in StrokeCapture) haben nach der Rotation keine Höhe
+        height = max_y - min_y or 1.0
         new_points = [((p[0] - min_x) * size / width,
                        (p[1] - min_y) * size / height)
                       for p in points]
@@ -194,66 +271,119 @@ class OneDollarRecognizer:
         return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
 
 
+    # Golden Section Search wie oben, aber für alle Paare (Geste, Template) gleichzeitig -> (B, T) Abstände
+    def batch_distance_at_best_angle(self, candidates, T, theta_a, theta_b, theta_delta):
+        shape = (len(candidates), len(T))
+        theta_a = np.full(shape, theta_a)
+        theta_b = np.full(shape, theta_b)
+        x1 = PHI * theta_a + (1 - PHI) * theta_b
+        x2 = (1 - PHI) * theta_a + PHI * theta_b
+        f1 = self.batch_distance_at_angle(candidates, T, x1)
+        f2 = self.batch_distance_at_angle(candidates, T, x2)
+
+        # Intervall schrumpft für alle Paare gleich schnell -> gleiche Anzahl an Schritten
+        while abs(theta_b[0, 0] - theta_a[0, 0]) > theta_delta:
+            left = f1 < f2
+            theta_b = np.where(left, x2, theta_b)
+            theta_a = np.where(left, theta_a, x1)
+            new_x = np.where(left, PHI * theta_a + (1 - PHI) * theta_b, (1 - PHI) * theta_a + PHI * theta_b)
+            f_new = self.batch_distance_at_angle(candidates, T, new_x)
+            x1, x2 = np.where(left, new_x, x2), np.where(left, x1, new_x)
+            f1, f2 = np.where(left, f_new, f2), np.where(left, f1, f_new)
+
+        return np.minimum(f1, f2)
+
+
+    def batch_distance_at_angle(self, candidates, T, theta):
+        c = candidates.mean(axis=1) # (B, 2)
+        x = (candidates[:, :, 0] - c[:, 0:1])[:, None, :] # (B, 1, n)
+        y = (candidates[:, :, 1] - c[:, 1:2])[:, None, :]
+        cos = np.cos(theta)[:, :, None] # (B, T, 1)
+        sin = np.sin(theta)[:, :, None]
+        qx = x * cos - y * sin + c[:, None, 0:1]
+        qy = x * sin + y * cos + c[:, None, 1:2]
+
+        return np.hypot(qx - T[None, :, :, 0], qy - T[None, :, :, 1]).mean(axis=2)
+
+
 # XML EXPORT UND IMPORT VON TEMPLATES ####################################################
    
     def save_templates_to_xml(self, directory):
-        os.makedirs(directory, exist_ok=True)
-        name_counts = {}
-
-        for name, points in self.templates:
-            count = name_counts.get(name, 0) + 1
-            name_counts[name] = count
-            number_str = f"{count:02}"
-            filename = f"{name}{number_str}.xml"
-            path = os.path.join(directory, filename)
+        save_gestures_to_xml(directory, self.templates, self.subject)
 
-            gesture = ET.Element("Gesture", {
-                "Name": name,
-                "Subject": self.subject,
-                "Speed": "unknown",
-                "Number": str(count),
-                "NumPts": str(len(points)),
-                "Milliseconds": "0",
-                "AppName": "GestureRecognizer",
-                "AppVer": "1.0",
-                "Date": datetime.now().strftime("%A, %B %d, %Y"),
-                "TimeOfDay": datetime.now().strftime("%I:%M:%S %p")
-            })
 
-            for x, y in points:
-                ET.SubElement(gesture, "Point", X=str(x), Y=str(y), T="0")
+    def load_templates_from_xml(self, directory):
+        for filename, name, points in load_gestures_from_xml(directory, self.n):
+            try:
+                self.add_template(name, list(points))
+                print(f"Template {filename} erfolgreich hinzugefügt.")
+
+            except Exception as e:
+                print(f"Fehler beim Laden von {filename}: {e}")
+
+
+# XML Dateien im Format von Wobbrocks Datensätzen (auch für Hand-Posen genutzt) ##############
+
+# Gesten als (name, points) Paare speichern, durchnummeriert je Name (z.B. circle01.xml)
+def save_gestures_to_xml(directory, gestures, subject, app_name="GestureRecognizer"):
+    os.makedirs(directory, exist_ok=True)
+    name_counts = {}
+
+    for name, points in gestures:
+        count = name_counts.get(name, 0) + 1
+        name_counts[name] = count
+        number_str = f"{count:02}"
+        filename = f"{name}{number_str}.xml"
+        path = os.path.join(directory, filename)
+
+        gesture = ET.Element("Gesture", {
+            "Name": name,
+            "Subject": subject,
+            "Speed": "unknown",
+            "Number": str(count),
+            "NumPts": str(len(points)),
+            "Milliseconds": "0",
+            "AppName": app_name,
+            "AppVer": "1.0",
+            "Date": datetime.now().strftime("%A, %B %d, %Y"),
+            "TimeOfDay": datetime.now().strftime("%I:%M:%S %p")
+        })
 
-            tree = ET.ElementTree(gesture)
-            tree.write(path, encoding="utf-8", xml_declaration=True)
+        for x, y in points:
+            ET.SubElement(gesture, "Point", X=str(x), Y=str(y), T="0")
 
+        tree = ET.ElementTree(gesture)
+        tree.write(path, encoding="utf-8", xml_declaration=True)
 
-    def load_templates_from_xml(self, directory):
-        print("Starte Import...")
-        if not os.path.exists(directory):
-            print(f"Ordner {directory} nicht gefunden. Keine Templates geladen")
-            return
-
-        for filename in os.listdir(directory):
-            if filename.endswith(".xml"):
-                path = os.path.join(directory, filename)
-                print(f"Versuche Datei zu laden: {filename}")
-                try:
-                    tree = ET.parse(path)
-                    root = tree.getroot()
-
-                    name = root.attrib.get("Name", "unknown")
-                    points = []
-                    for pt in root.findall("Point"):
-                        x = float(pt.attrib["X"])
-                        y = float(pt.attrib["Y"])
-                        points.append((x, y))
-
-                    if len(points) < self.n:
-                        print(f"Datei {filename} enthält zu wenige Punkte, wird übersprungen")
-                        continue
-
-                    self.add_template(name, list(points))
-                    print(f"Template {filename} erfolgreich hinzugefügt.")
-
-                except Exception as e:
-                    print(f"Fehler beim Laden von {filename}: {e}")
\ No newline at end of file
+
+# Alle Gesten eines Ordners einlesen, liefert (dateiname, name, points) je Datei mit mindestens min_points Punkten
+def load_gestures_from_xml(directory, min_points=0):
+    print("Starte Import...")
+    if not os.path.exists(directory):
+        print(f"Ordner {directory} nicht gefunden. Keine Templates geladen")
+        return
+
+    for filename in os.listdir(directory):
+        if filename.endswith(".xml"):
+            path = os.path.join(directory, filename)
+            print(f"Versuche Datei zu laden: {filename}")
+            try:
+                tree = ET.parse(path)
+                root = tree.getroot()
+
+                name = root.attrib.get("Name", "unknown")
+                points = []
+                for pt in root.findall("Point"):
+                    x = float(pt.attrib["X"])
+                    y = float(pt.attrib["Y"])
+                    points.append((x, y))
+
+            except Exception as e:
+                print(f"Fehler beim Laden von {filename}: {e}")
+                continue
+
+            if len(points) < min_points:
+                print(f"Datei {filename} enthält zu wenige Punkte, wird übersprungen")
+                continue
+
+            yield filename, name, points
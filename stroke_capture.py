@@ -0,0 +1,108 @@
+# Erfassung eines Strichs während des Zeichnens: fast gerade Stücke werden zusammengefasst, die Länge des Puffers ist begrenzt
+import math
+import time
+
+RESAMPLE_POINTS = 64 # Punktanzahl, auf die der Recognizer später resampled
+TOLERANCE = 0.05 # Max Umweg aller zusammengefassten Punkte zusammen gegenüber den Sehnen, als Anteil des resample-Abstands (Pfadlänge / (n - 1))
+MAX_POINTS = 4096 # Ab so vielen Punkten wird mit wachsender Toleranz ausgedünnt, bis höchstens die Hälfte übrig ist
+
+# Rückgabewerte von add()
+APPENDED = "appended" # Neuer Punkt angehängt
+REPLACED = "replaced" # Bisher letzter Punkt durch den neuen ersetzt (zusammengefasst)
+IGNORED = "ignored" # Gleiche Position wie zuvor, nichts gespeichert
+
+
+class StrokeCapture:
+
+    def __init__(self, resample_points=RESAMPLE_POINTS, tolerance=TOLERANCE, max_points=MAX_POINTS):
+        self.resample_points = resample_points
+        self.tolerance = tolerance
+        self.max_points = max_points
+        self.points = []
+        self.lengths = [] # Pfadlänge vom Start bis zum jeweiligen Punkt (auch über zusammengefasste Punkte)
+        self.times = [] # Zeitstempel (time.perf_counter) je Punkt
+        self.path_length = 0.0 # Laufend mitgeführte Pfadlänge aller Bewegungen
+        self.lost_length = 0.0 # Durch Zusammenfassen bereits abgeschnittene Pfadlänge (ohne das letzte Stück)
+        self.last_raw = None # Letzte empfangene Position (auch wenn sie zusammengefasst wurde)
+        self.num_events = 0 # Anzahl empfangener Positionen (ohne Wiederholungen), z.B. für die Mindestlänge einer Geste
+
+
+    # Neuen Strich beginnen
+    def start(self, x, y, t=None):
+        self.clear()
+        return self.add(x, y, t)
+
+
+    # Punkt hinzufügen (t: Zeitstempel, sonst jetzt), liefert APPENDED, REPLACED oder IGNORED.
+    # Liegt der bisher letzte Punkt fast auf der Strecke vom vorletzten zum neuen, wird er ersetzt.
+    # resample verteilt die Punkte nach Pfadlänge, daher zählt der Umweg (Pfadlänge - Sehne) und nicht nur der Abstand.
+    def add(self, x, y, t=None):
+        if t is None:
+            t = time.perf_counter()
+        if self.last_raw is not None:
+            step = math.hypot(x - self.last_raw[0], y - self.last_raw[1])
+            if step == 0.0:
+                return IGNORED
+            self.path_length += step
+        self.last_raw = (x, y)
+        self.num_events += 1
+
+        if len(self.points) >= 2 and self.lost_length + self.detour(len(self.points) - 2, x, y, self.path_length) <= self.max_detour():
+            self.points[-1] = (x, y)
+            self.lengths[-1] = self.path_length
+            self.times[-1] = t
+            return REPLACED
+
+        if len(self.points) >= 2:
+            self.lost_length += self.detour(len(self.points) - 2, *self.points[-1], self.lengths[-1])
+        self.points.append((x, y))
+        self.lengths.append(self.path_length)
+        self.times.append(t)
+        if len(self.points) > self.max_points:
+            self.thin()
+        return APPENDED
+
+
+    # Umweg des Pfads von Punkt i bis (x, y) mit Pfadlänge length gegenüber der direkten Verbindung
+    def detour(self, i, x, y, length):
+        x1, y1 = self.points[i]
+        return length - self.lengths[i] - math.hypot(x - x1, y - y1)
+
+
+    # Erlaubter Umweg: Bruchteil des Abstands der späteren resample-Punkte
+    def max_detour(self):
+        return self.tolerance * self.path_length / (self.resample_points - 1)
+
+
+    # Puffer voll: mit aktuell erlaubtem Umweg erneut zusammenfassen (anfangs war der Pfad kürzer, also strenger),
+    # bei stark gewundenen Strichen den Umweg so lange verdoppeln, bis höchstens die Hälfte der Punkte übrig ist
+    def thin(self):
+        max_detour = self.max_detour()
+        while len(self.points) > self.max_points // 2:
+            points, lengths, times = self.points, self.lengths, self.times
+            self.points, self.lengths, self.times = [points[0]], [lengths[0]], [times[0]]
+            for (x, y), length, t in zip(points[1:], lengths[1:], times[1:]):
+                if len(self.points) >= 2 and self.detour(len(self.points) - 2, x, y, length) <= max_detour:
+                    self.points[-1] = (x, y)
+                    self.lengths[-1] = length
+                    self.times[-1] = t
+                else:
+                    self.points.append((x, y))
+                    self.lengths.append(length)
+                    self.times.append(t)
+            max_detour *= 2
+        self.lost_length = self.lengths[-2] - self.lengths[0] - sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(self.points[:-2], self.points[1:-1]))
+
+
+    def clear(self):
+        self.points = []
+        self.lengths = []
+        self.times = []
+        self.path_length = 0.0
+        self.lost_length = 0.0
+        self.last_raw = None
+        self.num_events = 0
+
+
+    def __len__(self):
+        return len(self.points)